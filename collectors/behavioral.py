@@ -9,26 +9,40 @@ Functional:
     has_search_autosuggest, has_quick_buy, broken_link_count, is_mobile_responsive
 
 Strategy:
-- Navigates homepage, dismisses overlays, finds a product link, traverses to checkout
+- Navigates homepage, dismisses overlays, screenshots it, finds a product link,
+  traverses to checkout
 - All actions are best-effort; failures degrade gracefully to -1 / 0
-- Handles SPAs (React/Next.js etc.) by waiting for network idle
+- Handles SPAs (React/Next.js etc.) by waiting for DOMContentLoaded plus a
+  bounded `load` settle, instead of network idle (trackers rarely go quiet)
+- Mobile layout and cart persistence are read from the desktop session; a
+  separate mobile context is only opened for sites that vary by User-Agent,
+  and it runs alongside the desktop traversal
 """
 
 import asyncio
 import logging
 import re
+import weakref
+from typing import Callable, Sequence
 from urllib.parse import urljoin, urlparse
 
-from playwright.async_api import async_playwright, Page, TimeoutError as PWTimeout
+from playwright.async_api import (
+    async_playwright, Browser, Locator, Page, TimeoutError as PWTimeout,
+)
 
 from config import (
-    HEADLESS, PAGE_TIMEOUT_MS, ACTION_TIMEOUT_MS,
+    HEADLESS, PAGE_TIMEOUT_MS, ACTION_TIMEOUT_MS, LOAD_SETTLE_MS,
     VIEWPORT_DESKTOP, VIEWPORT_MOBILE, USER_AGENT, SCREENSHOT_PATH
 )
 
 log = logging.getLogger(__name__)
 
-# ── Selectors (ordered by specificity — first match wins) ─────────────────────
+MOBILE_USER_AGENT = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) "
+    "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+)
+
+# ── Selectors (each list is probed as one OR-query — first visible match wins) ─
 CLOSE_OVERLAY_SELECTORS = [
     "[aria-label*='close' i]", "[aria-label*='dismiss' i]",
     "button:has-text('×')", "button:has-text('✕')",
@@ -37,15 +51,25 @@ CLOSE_OVERLAY_SELECTORS = [
     "#onetrust-accept-btn-handler",          # OneTrust cookie banner
     ".cc-btn.cc-dismiss",                    # Cookie Consent
     "[data-testid='close-button']",
+]
+
+# Broad substring matches (also hit "disclosure", "enclosure", ...); only
+# probed when nothing in CLOSE_OVERLAY_SELECTORS is visible
+CLOSE_OVERLAY_FALLBACK_SELECTORS = [
     "[class*='close']", "[id*='close']",
 ]
 
 CART_SELECTORS = [
-    "a[href*='cart']", "a[href*='basket']", "a[href*='bag']",
+    "a[href*='cart']", "a[href*='basket']",
     "[aria-label*='cart' i]", "[aria-label*='basket' i]",
     "[data-testid*='cart']", ".cart-icon", "#cart",
 ]
 
+# Also hits "/handbags" and the like; only used when no cart link is visible
+CART_FALLBACK_SELECTORS = [
+    "a[href*='bag']",
+]
+
 CHECKOUT_SELECTORS = [
     "a[href*='checkout']", "button:has-text('Checkout')",
     "button:has-text('Proceed to checkout')", "button:has-text('Go to checkout')",
@@ -62,9 +86,15 @@ ADD_TO_CART_SELECTORS = [
     "button:has-text('Add to cart')", "button:has-text('Add to bag')",
     "button:has-text('Add to basket')", "button:has-text('Buy now')",
     "[data-testid*='add-to-cart']", ".add-to-cart", "#add-to-cart",
+]
+
+# Also hits add-to-wishlist / add-to-compare; only used when nothing above is visible
+ADD_TO_CART_FALLBACK_SELECTORS = [
     "button[name*='add']",
 ]
 
+CART_COOKIE_RE = re.compile(r"cart|basket|bag", re.IGNORECASE)
+
 PRODUCT_LINK_PATTERNS = re.compile(
     r"/(product|item|p|shop|detail|goods|pd)/", re.IGNORECASE
 )
@@ -78,6 +108,11 @@ SEARCH_INPUT_SELECTORS = [
 AUTOSUGGEST_SELECTORS = [
     ".suggestions", ".autocomplete", "[role='listbox']",
     "[data-testid*='suggest']", "[class*='suggest']", "[class*='autocomplete']",
+]
+
+# Nav menus use the same class names, so this only counts if it wasn't
+# already visible before typing
+AUTOSUGGEST_FALLBACK_SELECTORS = [
     "[class*='dropdown']",
 ]
 
@@ -87,16 +122,153 @@ QUICK_BUY_SELECTORS = [
 ]
 
 
+def _is_pure_css(sel: str) -> bool:
+    """False for Playwright-only pseudo-classes that can't join a CSS list."""
+    return ":has-text(" not in sel
+
+
+def _selector_group(selectors: list[str]) -> tuple[str, str]:
+    """Comma-join a selector list into (pure CSS, Playwright text) halves."""
+    css  = ", ".join(s for s in selectors if _is_pure_css(s))
+    text = ", ".join(s for s in selectors if not _is_pure_css(s))
+    return css, text
+
+
+# Precomputed once at import so each probe is a single browser-side query
+CLOSE_OVERLAY_CSV        = _selector_group(CLOSE_OVERLAY_SELECTORS)
+CLOSE_FALLBACK_CSV       = _selector_group(CLOSE_OVERLAY_FALLBACK_SELECTORS)
+CART_CSV                 = _selector_group(CART_SELECTORS)
+CART_FALLBACK_CSV        = _selector_group(CART_FALLBACK_SELECTORS)
+CHECKOUT_CSV             = _selector_group(CHECKOUT_SELECTORS)
+GUEST_CHECKOUT_CSV       = _selector_group(GUEST_CHECKOUT_SELECTORS)
+ADD_TO_CART_CSV          = _selector_group(ADD_TO_CART_SELECTORS)
+ADD_TO_CART_FALLBACK_CSV = _selector_group(ADD_TO_CART_FALLBACK_SELECTORS)
+SEARCH_INPUT_CSV         = _selector_group(SEARCH_INPUT_SELECTORS)
+AUTOSUGGEST_CSV          = _selector_group(AUTOSUGGEST_SELECTORS)
+AUTOSUGGEST_FALLBACK_CSV = _selector_group(AUTOSUGGEST_FALLBACK_SELECTORS)
+QUICK_BUY_CSV            = _selector_group(QUICK_BUY_SELECTORS)
+
+# Locators built for each live page, reused across repeated probes
+_locator_cache: "weakref.WeakKeyDictionary[Page, dict[tuple[str, str], Locator]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+# Requests aborted once the screenshot is taken (behavioral probes only)
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "facebook.net", "hotjar.com", "clarity.ms", "segment.io",
+)
+
+# Max in-flight link checks per page during the broken-link scan
+BROKEN_LINK_CONCURRENCY = 5
+
+# Collects the first N hrefs in the browser so discovery is one round-trip
+_HREFS_JS = "(els, limit) => els.slice(0, limit).map(e => e.getAttribute('href'))"
+
+
+# Resolves once LCP has been reported and web fonts are ready, or after 4 s
+_VISUAL_READY_JS = """() => Promise.race([
+    Promise.all([
+        new Promise(r => new PerformanceObserver(() => r())
+            .observe({type: "largest-contentful-paint", buffered: true})),
+        document.fonts.ready,
+    ]),
+    new Promise(r => setTimeout(r, 4000)),
+]).then(() => true)"""
+
+
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
-async def _safe_click(page: Page, selectors: list[str]) -> bool:
-    """Try each selector; return True if one worked."""
-    for sel in selectors:
+async def _block_heavy(route) -> None:
+    """Route handler: drop images/fonts/media and analytics beacons."""
+    req = route.request
+    if req.resource_type in BLOCKED_RESOURCE_TYPES or any(d in req.url for d in BLOCKED_DOMAINS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _settle(page: Page) -> None:
+    """Give `load` a short, bounded chance to fire; don't wait for network idle."""
+    try:
+        await page.wait_for_load_state("load", timeout=LOAD_SETTLE_MS)
+    except PWTimeout:
+        pass
+
+
+async def _goto(page: Page, url: str):
+    """Navigate and return as soon as the DOM is usable (plus a brief settle)."""
+    resp = await page.goto(url, wait_until="domcontentloaded", timeout=PAGE_TIMEOUT_MS)
+    await _settle(page)
+    return resp
+
+
+async def _wait_loaded(page: Page) -> None:
+    """Same wait as `_goto`, for navigations triggered by a click."""
+    await page.wait_for_load_state("domcontentloaded", timeout=PAGE_TIMEOUT_MS)
+    await _settle(page)
+
+
+async def _visually_ready(page: Page) -> None:
+    """Wait (max ~4 s) for the largest paint and fonts before a screenshot."""
+    try:
+        await page.evaluate(_VISUAL_READY_JS)
+    except Exception:
+        pass
+
+
+def _page_cache(page: Page) -> dict:
+    """Per-page locator cache; emptied on main-frame navigation, dropped on close."""
+    cache = _locator_cache.get(page)
+    if cache is None:
+        cache = _locator_cache[page] = {}
+        page.on("framenavigated",
+                lambda frame: frame.parent_frame is None and cache.clear())
+        page.on("close", lambda _: _locator_cache.pop(page, None))
+    return cache
+
+
+def _any_of(page: Page, group: tuple[str, str]) -> Locator:
+    """Locator for the first visible element matching any selector in the group."""
+    cache = _page_cache(page)
+    loc   = cache.get(group)
+    if loc is None:
+        css, text = group
+        if css and text:
+            loc = page.locator(css).or_(page.locator(text))
+        else:
+            loc = page.locator(css or text)
+        loc = cache[group] = loc.locator("visible=true").first
+    return loc
+
+
+def _any_of_groups(page: Page, groups: Sequence[tuple[str, str]]) -> Locator:
+    """Locator for the first visible element matching any of several groups."""
+    loc = _any_of(page, groups[0])
+    for group in groups[1:]:
+        loc = loc.or_(_any_of(page, group))
+    return loc.first
+
+
+async def _safe_click(page: Page, *groups: tuple[str, str]) -> bool:
+    """
+    Click the first visible match, trying `groups` in priority order (a later
+    group only if nothing in the earlier ones is visible or its click fails).
+    Returns True if a click worked.
+    """
+    # One wait for any group to show up, then pick by priority
+    try:
+        await _any_of_groups(page, groups).wait_for(state="visible", timeout=ACTION_TIMEOUT_MS)
+    except Exception:
+        return False
+    for group in groups:
         try:
-            el = page.locator(sel).first
-            await el.wait_for(state="visible", timeout=ACTION_TIMEOUT_MS)
-            await el.click(timeout=ACTION_TIMEOUT_MS)
-            return True
+            el = _any_of(page, group)
+            if await el.is_visible():
+                await el.click(timeout=ACTION_TIMEOUT_MS)
+                return True
         except Exception:
             continue
     return False
@@ -107,10 +279,11 @@ async def _dismiss_overlays(page: Page) -> int:
     count = 0
     for _ in range(5):          # up to 5 rounds
         dismissed = False
-        for sel in CLOSE_OVERLAY_SELECTORS:
+        # Specific close buttons first; the generic group only if none worked
+        for group in (CLOSE_OVERLAY_CSV, CLOSE_FALLBACK_CSV):
             try:
-                el = page.locator(sel).first
-                if await el.is_visible(timeout=1_500):
+                el = _any_of(page, group)
+                if await el.is_visible():
                     await el.click(timeout=ACTION_TIMEOUT_MS)
                     count += 1
                     dismissed = True
@@ -131,14 +304,13 @@ async def _find_product_url(page: Page, base_url: str) -> str | None:
     3. Click the first non-nav image link
     """
     # Strategy 1 — links whose href matches product patterns
-    anchors = await page.locator("a[href]").all()
-    for a in anchors[:60]:
-        try:
-            href = await a.get_attribute("href", timeout=500)
-            if href and PRODUCT_LINK_PATTERNS.search(href):
-                return urljoin(base_url, href)
-        except Exception:
-            continue
+    try:
+        hrefs = await page.eval_on_selector_all("a[href]", _HREFS_JS, 60)
+    except Exception:
+        hrefs = []
+    for href in hrefs:
+        if href and PRODUCT_LINK_PATTERNS.search(href):
+            return urljoin(base_url, href)
 
     # Strategy 2 — links inside product grid containers
     grid_selectors = [
@@ -155,49 +327,88 @@ async def _find_product_url(page: Page, base_url: str) -> str | None:
             continue
 
     # Strategy 3 — any anchor that isn't nav/footer
-    for a in anchors[5:30]:
-        try:
-            href = await a.get_attribute("href", timeout=500)
-            if href and href.startswith(("/", base_url)) and "#" not in href:
-                return urljoin(base_url, href)
-        except Exception:
-            continue
+    for href in hrefs[5:30]:
+        if href and href.startswith(("/", base_url)) and "#" not in href:
+            return urljoin(base_url, href)
 
     return None
 
 
+async def _is_404(page: Page, full: str, sem: asyncio.Semaphore) -> bool:
+    """HEAD the link (GET if HEAD isn't allowed) and report a 404."""
+    async with sem:
+        try:
+            resp = await page.request.fetch(full, method="HEAD", timeout=8_000)
+            if resp.status in (405, 501):
+                resp = await page.request.get(full, timeout=8_000)
+            return resp.status == 404
+        except Exception:
+            return False
+
+
 async def _count_broken_links(page: Page, base_url: str) -> int:
     """Sample up to 10 internal nav links and count 404 responses."""
-    broken = 0
     seen   = set()
-    origin = urlparse(base_url).netloc
+    urls   = []
+    parsed = urlparse(base_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    # Prefix test on the joined URL avoids a urlparse per anchor
+    same_origin = (origin + "/", origin + "?", origin + "#")
 
     try:
-        anchors = await page.locator("nav a[href], header a[href], [class*='menu'] a[href]").all()
-        for a in anchors[:10]:
-            try:
-                href = await a.get_attribute("href", timeout=500)
-                if not href or href in seen or href.startswith(("#", "mailto:", "tel:")):
-                    continue
-                full = urljoin(base_url, href)
-                if urlparse(full).netloc != origin:
-                    continue
-                seen.add(href)
-                resp = await page.request.get(full, timeout=8_000)
-                if resp.status == 404:
-                    broken += 1
-            except Exception:
+        hrefs = await page.eval_on_selector_all(
+            "nav a[href], header a[href], [class*='menu'] a[href]", _HREFS_JS, 10
+        )
+        for href in hrefs:
+            if not href or href in seen or href.startswith(("#", "mailto:", "tel:")):
+                continue
+            full = urljoin(base_url, href)
+            if not (full == origin or full.startswith(same_origin)):
                 continue
+            seen.add(href)
+            urls.append(full)
     except Exception:
-        pass
+        return 0
 
-    return broken
+    sem     = asyncio.Semaphore(BROKEN_LINK_CONCURRENCY)
+    results = await asyncio.gather(*(_is_404(page, u, sem) for u in urls))
+    return sum(results)
 
 
-# ── Main collector ─────────────────────────────────────────────────────────────
+async def _is_responsive(page: Page) -> int:
+    """1 if the page doesn't overflow horizontally at its current (mobile) width."""
+    # Check for horizontal scroll (a sign of broken mobile layout)
+    scroll_width = await page.evaluate("document.body.scrollWidth")
+    return int(scroll_width <= VIEWPORT_MOBILE["width"] + 20)
 
-async def get_behavioral_metrics(url: str) -> dict:
-    defaults = {
+
+async def _has_persistent_cart_cookie(page: Page) -> int:
+    """1 if the context holds a non-session cart cookie (survives a new session)."""
+    cookies = await page.context.cookies()
+    return int(any(
+        CART_COOKIE_RE.search(c["name"]) and c.get("expires", -1) > 0
+        for c in cookies
+    ))
+
+
+# ── Passes (each owns its own browser context) ─────────────────────────────────
+
+async def _desktop_pass(
+    browser: Browser,
+    url: str,
+    on_screenshot: Callable[[str], None] | None = None,
+    screenshot_path: str = SCREENSHOT_PATH,
+    on_mobile_needed: Callable[[], None] | None = None,
+) -> dict:
+    """
+    Gemini screenshot, homepage probes and checkout traversal.
+    `on_screenshot(screenshot_path)` is called as soon as the screenshot is written.
+    Also measures mobile layout by resizing this page, unless the server
+    varies its response by User-Agent: then `on_mobile_needed()` is called as
+    soon as the homepage response is in, so the caller can start `_mobile_pass`
+    alongside the rest of this pass, and `is_mobile_responsive` is left out.
+    """
+    result = {
         "popup_count":            0,
         "has_guest_checkout":     0,
         "click_depth_to_checkout":-1,
@@ -205,170 +416,256 @@ async def get_behavioral_metrics(url: str) -> dict:
         "has_search_autosuggest": 0,
         "has_quick_buy":          0,
         "broken_link_count":      0,
-        "is_mobile_responsive":   0,
-        "page_html":              "",   # passed to trust collector
+        "page_html":              "",
     }
 
-    async with async_playwright() as pw:
-        # ── Desktop browser ────────────────────────────────────────────────────
-        browser = await pw.chromium.launch(headless=HEADLESS)
-        ctx     = await browser.new_context(
-            viewport=VIEWPORT_DESKTOP,
-            user_agent=USER_AGENT,
-            ignore_https_errors=True,
-        )
+    ctx = await browser.new_context(
+        viewport=VIEWPORT_DESKTOP,
+        user_agent=USER_AGENT,
+        ignore_https_errors=True,
+    )
+    try:
         page = await ctx.new_page()
         page.set_default_timeout(PAGE_TIMEOUT_MS)
 
+        # ── 1. Load homepage (all resources — the screenshot needs images) ────
+        resp = await _goto(page, url)
+        needs_mobile = resp is None or "user-agent" in resp.headers.get("vary", "").lower()
+        if needs_mobile and on_mobile_needed is not None:
+            on_mobile_needed()
+        result["popup_count"] += await _dismiss_overlays(page)
+        result["page_html"]    = await page.content()
+
+        # ── 2. Screenshot for Gemini, handed off right away ───────────────────
         try:
-            # ── 1. Load homepage ───────────────────────────────────────────────
-            await page.goto(url, wait_until="networkidle", timeout=PAGE_TIMEOUT_MS)
-            defaults["popup_count"] += await _dismiss_overlays(page)
-            defaults["page_html"]    = await page.content()
+            await _visually_ready(page)
+            await page.screenshot(path=screenshot_path, full_page=False)
+            if on_screenshot is not None:
+                on_screenshot(screenshot_path)
+        except Exception:
+            pass
 
-            # ── 2. Broken links ────────────────────────────────────────────────
-            defaults["broken_link_count"] = await _count_broken_links(page, url)
+        # ── 3. Mobile responsiveness (same page, mobile-sized viewport) ───────
+        if not needs_mobile:
+            try:
+                await page.set_viewport_size(VIEWPORT_MOBILE)
+                await page.wait_for_timeout(300)    # let resize handlers settle
+                result["is_mobile_responsive"] = await _is_responsive(page)
+                await page.set_viewport_size(VIEWPORT_DESKTOP)
+            except Exception:
+                pass
 
-            # ── 3. Search autosuggest ──────────────────────────────────────────
-            for sel in SEARCH_INPUT_SELECTORS:
-                try:
-                    inp = page.locator(sel).first
-                    if await inp.is_visible(timeout=2_000):
-                        await inp.click(timeout=ACTION_TIMEOUT_MS)
-                        await inp.type("shirt", delay=80)
-                        await page.wait_for_timeout(1_200)
-                        for asel in AUTOSUGGEST_SELECTORS:
-                            try:
-                                if await page.locator(asel).first.is_visible(timeout=1_000):
-                                    defaults["has_search_autosuggest"] = 1
-                                    break
-                            except Exception:
-                                continue
-                        await inp.fill("")
-                        break
-                except Exception:
-                    continue
-
-            # ── 4. Quick buy ───────────────────────────────────────────────────
-            for sel in QUICK_BUY_SELECTORS:
-                try:
-                    if await page.locator(sel).first.is_visible(timeout=1_000):
-                        defaults["has_quick_buy"] = 1
-                        break
-                except Exception:
-                    continue
+        # Everything from here on is behavioral only — skip the heavy assets
+        await page.route("**/*", _block_heavy)
 
-            # ── 5. Navigate to a product page ──────────────────────────────────
-            product_url = await _find_product_url(page, url)
-            click_depth = 1
+        # ── 4. Broken links ────────────────────────────────────────────────────
+        result["broken_link_count"] = await _count_broken_links(page, url)
 
-            if product_url and product_url != url:
+        # ── 5. Search autosuggest ──────────────────────────────────────────────
+        try:
+            inp = _any_of(page, SEARCH_INPUT_CSV)
+            if await inp.is_visible():
+                # A dropdown that is already showing is nav, not suggestions
+                fallback = _any_of(page, AUTOSUGGEST_FALLBACK_CSV)
+                groups   = [AUTOSUGGEST_CSV]
+                if not await fallback.is_visible():
+                    groups.append(AUTOSUGGEST_FALLBACK_CSV)
+                await inp.click(timeout=ACTION_TIMEOUT_MS)
+                # fill() sets the value at once; the final keypress fires the
+                # key events debounced suggestion handlers listen for
+                await inp.fill("shir")
+                await inp.press("t")
                 try:
-                    await page.goto(product_url, wait_until="networkidle",
-                                    timeout=PAGE_TIMEOUT_MS)
-                    defaults["popup_count"] += await _dismiss_overlays(page)
+                    await _any_of_groups(page, groups).wait_for(state="visible", timeout=1_500)
+                    result["has_search_autosuggest"] = 1
+                except PWTimeout:
+                    pass
+                await inp.fill("")
+        except Exception:
+            pass
+
+        # ── 6. Quick buy ───────────────────────────────────────────────────────
+        try:
+            result["has_quick_buy"] = int(await _any_of(page, QUICK_BUY_CSV).is_visible())
+        except Exception:
+            pass
+
+        # ── 7. Navigate to a product page ──────────────────────────────────────
+        product_url = await _find_product_url(page, url)
+        click_depth = 1
+
+        if product_url and product_url != url:
+            try:
+                await _goto(page, product_url)
+                result["popup_count"] += await _dismiss_overlays(page)
+                click_depth += 1
+
+                # Quick buy on PDP
+                if not result["has_quick_buy"]:
+                    try:
+                        result["has_quick_buy"] = int(
+                            await _any_of(page, QUICK_BUY_CSV).is_visible()
+                        )
+                    except Exception:
+                        pass
+
+                # ── 8. Add to cart ─────────────────────────────────────────────
+                added = await _safe_click(page, ADD_TO_CART_CSV, ADD_TO_CART_FALLBACK_CSV)
+
+                if added:
+                    await page.wait_for_timeout(1_500)
                     click_depth += 1
+                    result["cart_persistence"] = await _has_persistent_cart_cookie(page)
+
+                    # ── 9. Go to cart ──────────────────────────────────────────
+                    cart_reached = await _safe_click(page, CART_CSV, CART_FALLBACK_CSV)
+                    if cart_reached:
+                        await _wait_loaded(page)
+                        result["popup_count"] += await _dismiss_overlays(page)
+                        click_depth += 1
+
+                        # ── 10. Go to checkout ─────────────────────────────────
+                        checkout_reached = await _safe_click(page, CHECKOUT_CSV)
+                        if checkout_reached:
+                            await _wait_loaded(page)
+                            result["popup_count"] += await _dismiss_overlays(page)
+                            click_depth += 1
+                            result["click_depth_to_checkout"] = click_depth
 
-                    # Quick buy on PDP
-                    if not defaults["has_quick_buy"]:
-                        for sel in QUICK_BUY_SELECTORS:
+                            # ── 11. Guest checkout ──────────────────────────────
                             try:
-                                if await page.locator(sel).first.is_visible(timeout=1_000):
-                                    defaults["has_quick_buy"] = 1
-                                    break
+                                result["has_guest_checkout"] = int(
+                                    await _any_of(page, GUEST_CHECKOUT_CSV).is_visible()
+                                )
                             except Exception:
-                                continue
+                                pass
 
-                    # ── 6. Add to cart ─────────────────────────────────────────
-                    added = await _safe_click(page, ADD_TO_CART_SELECTORS)
+            except Exception as e:
+                log.debug(f"[Behavioral] checkout traversal failed: {e}")
 
-                    if added:
-                        await page.wait_for_timeout(1_500)
-                        click_depth += 1
+    except Exception as e:
+        log.warning(f"[Behavioral] fatal for {url}: {e}")
 
-                        # ── 7. Go to cart ──────────────────────────────────────
-                        cart_reached = await _safe_click(page, CART_SELECTORS)
-                        if cart_reached:
-                            await page.wait_for_load_state("networkidle",
-                                                           timeout=PAGE_TIMEOUT_MS)
-                            defaults["popup_count"] += await _dismiss_overlays(page)
-                            click_depth += 1
+    finally:
+        await ctx.close()
 
-                            # ── 8. Go to checkout ──────────────────────────────
-                            checkout_reached = await _safe_click(page, CHECKOUT_SELECTORS)
-                            if checkout_reached:
-                                await page.wait_for_load_state("networkidle",
-                                                               timeout=PAGE_TIMEOUT_MS)
-                                defaults["popup_count"] += await _dismiss_overlays(page)
-                                click_depth += 1
-                                defaults["click_depth_to_checkout"] = click_depth
-
-                                # ── 9. Guest checkout ───────────────────────────
-                                for sel in GUEST_CHECKOUT_SELECTORS:
-                                    try:
-                                        if await page.locator(sel).first.is_visible(
-                                                timeout=2_000):
-                                            defaults["has_guest_checkout"] = 1
-                                            break
-                                    except Exception:
-                                        continue
-
-                except Exception as e:
-                    log.debug(f"[Behavioral] checkout traversal failed: {e}")
-
-            # ── 10. Screenshot for Gemini ──────────────────────────────────────
-            try:
-                await page.goto(url, wait_until="networkidle", timeout=PAGE_TIMEOUT_MS)
-                await page.screenshot(path=SCREENSHOT_PATH, full_page=False)
-            except Exception:
-                pass
+    return result
 
-        except Exception as e:
-            log.warning(f"[Behavioral] fatal for {url}: {e}")
 
-        finally:
-            await ctx.close()
+async def _mobile_pass(browser: Browser, url: str) -> dict:
+    """Mobile responsiveness in a fresh iPhone context (UA-dependent sites only)."""
+    result = {"is_mobile_responsive": 0}
 
-        # ── 11. Cart persistence test (fresh context = new browser session) ────
-        ctx2 = await browser.new_context(
-            viewport=VIEWPORT_DESKTOP,
-            user_agent=USER_AGENT,
-            ignore_https_errors=True,
-        )
-        page2 = await ctx2.new_page()
+    ctx = await browser.new_context(
+        viewport=VIEWPORT_MOBILE,
+        user_agent=MOBILE_USER_AGENT,
+        ignore_https_errors=True,
+    )
+    try:
+        page = await ctx.new_page()
+        await _goto(page, url)
+        result["is_mobile_responsive"] = await _is_responsive(page)
+    except Exception:
+        pass
+    finally:
+        await ctx.close()
+
+    return result
+
+
+# ── Main collector ─────────────────────────────────────────────────────────────
+
+async def get_behavioral_metrics(
+    url: str,
+    browser: Browser | None = None,
+    on_screenshot: Callable[[str], None] | None = None,
+    screenshot_path: str = SCREENSHOT_PATH,
+) -> dict:
+    """
+    Collects behavioral + functional metrics for `url`.
+    Pass an already-launched `browser` to reuse it; otherwise one is launched
+    and closed just for this call. `on_screenshot(path)` fires once the
+    homepage screenshot exists, so visual scoring can start early. Give
+    concurrent calls distinct `screenshot_path`s.
+    """
+    if browser is None:
+        async with BehavioralCollector() as bc:
+            return await bc.collect(url, on_screenshot, screenshot_path)
+
+    defaults = {
+        "popup_count":            0,
+        "has_guest_checkout":     0,
+        "click_depth_to_checkout":-1,
+        "cart_persistence":       0,
+        "has_search_autosuggest": 0,
+        "has_quick_buy":          0,
+        "broken_link_count":      0,
+        "is_mobile_responsive":   0,
+        "page_html":              "",   # passed to trust collector
+    }
+
+    # Only sites serving different markup to mobile UAs need a second load;
+    # the desktop pass says so right after the homepage response, and the
+    # mobile context then runs concurrently with the rest of the traversal
+    mobile_task = None
+
+    def start_mobile():
+        nonlocal mobile_task
+        mobile_task = asyncio.create_task(_mobile_pass(browser, url))
+
+    try:
+        desk = await _desktop_pass(browser, url, on_screenshot, screenshot_path,
+                                   on_mobile_needed=start_mobile)
+        defaults.update(desk)
+        if mobile_task is not None:
+            defaults.update(await mobile_task)
+        elif "is_mobile_responsive" not in desk:
+            # Desktop pass failed before it could measure the layout itself
+            defaults.update(await _mobile_pass(browser, url))
+    except Exception as e:
+        log.warning(f"[Behavioral] pass failed for {url}: {e}")
+    finally:
+        if mobile_task is not None:
+            mobile_task.cancel()    # no-op once it has finished
+
+    return defaults
+
+
+class BehavioralCollector:
+    """
+    Owns one Playwright/Chromium pair shared by every `collect` call, so a
+    batch pays the browser cold start once:
+
+        async with BehavioralCollector() as bc:
+            results = await asyncio.gather(*(bc.collect(u) for u in urls))
+    """
+
+    def __init__(self, headless: bool = HEADLESS):
+        self.headless = headless
+        self.browser: Browser | None = None
+        self._pw = None
+
+    async def __aenter__(self) -> "BehavioralCollector":
+        self._pw = await async_playwright().start()
         try:
-            cart_url = urljoin(url, "/cart")
-            await page2.goto(cart_url, wait_until="networkidle",
-                             timeout=PAGE_TIMEOUT_MS)
-            body = (await page2.inner_text("body")).lower()
-            # If cart page references items / quantity it likely persisted via cookies
-            if any(kw in body for kw in ["item", "product", "quantity", "subtotal"]):
-                defaults["cart_persistence"] = 1
+            self.browser = await self._pw.chromium.launch(headless=self.headless)
         except Exception:
-            pass
-        finally:
-            await ctx2.close()
-
-        # ── 12. Mobile responsiveness ──────────────────────────────────────────
-        ctx3 = await browser.new_context(
-            viewport=VIEWPORT_MOBILE,
-            user_agent=(
-                "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) "
-                "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
-            ),
-            ignore_https_errors=True,
-        )
-        page3 = await ctx3.new_page()
+            await self._pw.stop()
+            raise
+        return self
+
+    async def __aexit__(self, *exc) -> None:
         try:
-            await page3.goto(url, wait_until="networkidle", timeout=PAGE_TIMEOUT_MS)
-            # Check for horizontal scroll (a sign of broken mobile layout)
-            scroll_width  = await page3.evaluate("document.body.scrollWidth")
-            viewport_width = VIEWPORT_MOBILE["width"]
-            defaults["is_mobile_responsive"] = int(scroll_width <= viewport_width + 20)
-        except Exception:
-            pass
+            await self.browser.close()
         finally:
-            await ctx3.close()
-            await browser.close()
-
-    return defaults
+            await self._pw.stop()
+
+    async def collect(
+        self,
+        url: str,
+        on_screenshot: Callable[[str], None] | None = None,
+        screenshot_path: str = SCREENSHOT_PATH,
+    ) -> dict:
+        return await get_behavioral_metrics(
+            url, self.browser, on_screenshot, screenshot_path
+        )
@@ -4,18 +4,120 @@ Fetches Core Web Vitals via Google PageSpeed Insights API.
 Returns: lcp_ms, cls, tbt_ms, ttfb_ms, performance_score
 """
 
-import requests
+import asyncio
 import logging
-from config import PAGESPEED_API_KEY, PAGESPEED_URL, PAGESPEED_STRATEGY
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from diskcache import Cache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from config import (
+    PAGESPEED_API_KEY, PAGESPEED_URL, PAGESPEED_STRATEGY,
+    PAGESPEED_CACHE_DIR, PAGESPEED_CACHE_TTL,
+)
 
 log = logging.getLogger(__name__)
 
+# Successful results per (url, strategy); PSI scores are stable for a while.
+# Opened on first use, so importing this module doesn't touch the sqlite DB.
+_psi_cache: Cache | None = None
 
-def get_performance_metrics(url: str) -> dict:
+
+def _cache() -> Cache:
+    global _psi_cache
+    if _psi_cache is None:
+        _psi_cache = Cache(PAGESPEED_CACHE_DIR, size_limit=100 << 20)
+    return _psi_cache
+
+
+def make_client() -> httpx.AsyncClient:
+    """
+    Pooled HTTP/2 client; share one across calls to reuse the TLS connection.
+    The API key goes in a header, so it never shows up in logged request URLs.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        headers={"X-Goog-Api-Key": PAGESPEED_API_KEY},
+        timeout=30,
+        limits=httpx.Limits(max_connections=20),
+    )
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429
+
+
+@retry(
+    retry=retry_if_exception(_is_rate_limited),
+    wait=wait_exponential(multiplier=2, max=60),
+    stop=stop_after_attempt(4),
+    reraise=True,
+)
+async def _fetch(client: httpx.AsyncClient, params: dict) -> dict:
+    """One PageSpeed request; backs off and retries on HTTP 429."""
+    resp = await client.get(PAGESPEED_URL, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _cache_key(url: str) -> str:
+    """Normalise `url` (lowercase scheme/host, no fragment) so variants share a hit."""
+    parts = urlsplit(url.strip())
+    norm  = urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                        parts.path or "/", parts.query, ""))
+    return f"{norm}|{PAGESPEED_STRATEGY}"
+
+
+def _cache_get(url: str) -> dict | None:
+    """Cached result for `url`; None on a miss or any cache error (e.g. a locked DB)."""
+    try:
+        return _cache().get(_cache_key(url))
+    except Exception as e:
+        log.debug(f"[Performance] cache read failed for {url} → {e}")
+        return None
+
+
+def _cache_put(url: str, result: dict) -> None:
+    """Best-effort cache write; a failure just means the next run refetches."""
+    try:
+        _cache().set(_cache_key(url), result, expire=PAGESPEED_CACHE_TTL)
+    except Exception as e:
+        log.debug(f"[Performance] cache write failed for {url} → {e}")
+
+
+def _extract(data: dict) -> dict:
+    """Pull our metrics out of a PageSpeed JSON response."""
+    cats   = data.get("lighthouseResult", {}).get("categories", {})
+    audits = data.get("lighthouseResult", {}).get("audits", {})
+
+    def audit_val(key, field="numericValue"):
+        return audits.get(key, {}).get(field, -1)
+
+    return {
+        "lcp_ms":            round(audit_val("largest-contentful-paint"), 2),
+        "cls":               round(audit_val("cumulative-layout-shift"), 4),
+        "tbt_ms":            round(audit_val("total-blocking-time"), 2),
+        "ttfb_ms":           round(audit_val("server-response-time"), 2),
+        "performance_score": round(
+            cats.get("performance", {}).get("score", -1) * 100, 1
+        ),
+    }
+
+
+async def get_performance_metrics_async(
+    url: str, client: httpx.AsyncClient | None = None
+) -> dict:
     """
     Calls the PageSpeed Insights API and extracts key performance metrics.
     All values default to -1 on failure so the row is still usable in ML.
+    Successful results are cached on disk for PAGESPEED_CACHE_TTL seconds.
+    Pass a shared `client` (see make_client) so concurrent calls reuse its
+    connections. Rate-limited (429) requests are retried with backoff.
     """
+    cached = _cache_get(url)
+    if cached is not None:
+        return cached
+
     defaults = {
         "lcp_ms":            -1,
         "cls":               -1,
@@ -27,29 +129,23 @@ def get_performance_metrics(url: str) -> dict:
     try:
         params = {
             "url":      url,
-            "key":      PAGESPEED_API_KEY,
             "strategy": PAGESPEED_STRATEGY,
         }
-        resp = requests.get(PAGESPEED_URL, params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-
-        cats   = data.get("lighthouseResult", {}).get("categories", {})
-        audits = data.get("lighthouseResult", {}).get("audits", {})
-
-        def audit_val(key, field="numericValue"):
-            return audits.get(key, {}).get(field, -1)
-
-        return {
-            "lcp_ms":            round(audit_val("largest-contentful-paint"), 2),
-            "cls":               round(audit_val("cumulative-layout-shift"), 4),
-            "tbt_ms":            round(audit_val("total-blocking-time"), 2),
-            "ttfb_ms":           round(audit_val("server-response-time"), 2),
-            "performance_score": round(
-                cats.get("performance", {}).get("score", -1) * 100, 1
-            ),
-        }
+        if client is None:
+            async with make_client() as own:
+                data = await _fetch(own, params)
+        else:
+            data = await _fetch(client, params)
+
+        result = _extract(data)
+        _cache_put(url, result)
+        return result
 
     except Exception as e:
         log.warning(f"[Performance] {url} → {e}")
         return defaults
+
+
+def get_performance_metrics(url: str) -> dict:
+    """Blocking wrapper around get_performance_metrics_async (no running loop)."""
+    return asyncio.run(get_performance_metrics_async(url))
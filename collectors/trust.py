@@ -11,7 +11,9 @@ Returns:
 
 import re
 import logging
-from bs4 import BeautifulSoup
+
+import ahocorasick
+from selectolax.lexbor import LexborHTMLParser
 
 log = logging.getLogger(__name__)
 
@@ -29,12 +31,93 @@ POLICY_KW  = {
 SOCIAL_DOMAINS = ["instagram.com", "facebook.com", "twitter.com", "tiktok.com",
                   "youtube.com", "pinterest.com", "linkedin.com"]
 
+# One alternation per signal, so each link is tested once rather than per keyword
+POLICY_RES = {
+    field: re.compile("|".join(map(re.escape, keywords)))
+    for field, keywords in POLICY_KW.items()
+}
+SOCIAL_RE = re.compile("|".join(map(re.escape, SOCIAL_DOMAINS)))
+LINK_SIGNALS = (*POLICY_RES, "has_social_links")
+
 PAYMENT_KW = ["visa", "mastercard", "paypal", "amex", "american express",
               "apple pay", "google pay", "stripe", "norton", "mcafee", "ssl"]
 
-
-def _text(soup: BeautifulSoup) -> str:
-    return soup.get_text(" ", strip=True).lower()
+# Single automaton for the keyword lists matched against page text — one pass
+# over the text finds every list's hits instead of one `in` scan per keyword
+TEXT_KW = {
+    "has_address":        ADDRESS_KW,
+    "has_payment_badges": PAYMENT_KW,
+}
+KW_AUTOMATON = ahocorasick.Automaton()
+for _field, _keywords in TEXT_KW.items():
+    for _kw in _keywords:
+        KW_AUTOMATON.add_word(_kw, _field)
+KW_AUTOMATON.make_automaton()
+
+# Elements whose contents aren't page text (BeautifulSoup's get_text skipped these)
+NON_TEXT_TAGS = ["script", "style", "template"]
+
+MIN_HTML_LEN = 512  # shorter documents (blank/error pages) skip parsing entirely
+MAX_IMAGES   = 200  # distinct <img> alt/src strings checked for payment badges
+
+# The eight signals summed into trust_score
+_HAS_KEYS = (
+    "has_phone", "has_email", "has_address",
+    "has_return_policy", "has_privacy_policy", "has_tos",
+    "has_social_links", "has_payment_badges",
+)
+
+
+def _text(tree: LexborHTMLParser) -> str:
+    """
+    Lower-cased document text, <head><title> and <noscript> included;
+    strips NON_TEXT_TAGS in place.
+    """
+    tree.strip_tags(NON_TEXT_TAGS)
+    return tree.root.text(separator=" ", strip=True).lower() if tree.root else ""
+
+
+def _keyword_hits(text: str) -> set[str]:
+    """Fields from TEXT_KW with at least one keyword present in `text`."""
+    hits = set()
+    for _, field in KW_AUTOMATON.iter(text):
+        hits.add(field)
+        if len(hits) == len(TEXT_KW):
+            break
+    return hits
+
+
+def _link_signals(tree: LexborHTMLParser) -> set[str]:
+    """Walk the anchors once and return the LINK_SIGNALS found; stops when all are."""
+    found = set()
+    for a in tree.css("a[href]"):
+        href = (a.attributes.get("href") or "").lower()
+        if "has_social_links" not in found and SOCIAL_RE.search(href):
+            found.add("has_social_links")
+        pending = [f for f in POLICY_RES if f not in found]
+        if pending:
+            # Newline-joined so a multi-word keyword can't straddle text and href
+            link = a.text(separator=" ", strip=True).lower() + "\n" + href
+            found.update(f for f in pending if POLICY_RES[f].search(link))
+        if len(found) == len(LINK_SIGNALS):
+            break
+    return found
+
+
+def _images_mention_payment(tree: LexborHTMLParser) -> bool:
+    """Scan distinct img alt/src strings for payment keywords; stop at first hit."""
+    seen = set()
+    for img in tree.css("img"):
+        s = ((img.attributes.get("alt") or "") + " "
+             + (img.attributes.get("src") or "")).lower()
+        if s in seen:
+            continue
+        seen.add(s)
+        if "has_payment_badges" in _keyword_hits(s):
+            return True
+        if len(seen) >= MAX_IMAGES:
+            break
+    return False
 
 
 def get_trust_signals(html: str) -> dict:
@@ -50,48 +133,33 @@ def get_trust_signals(html: str) -> dict:
         "trust_score":        0,
     }
 
-    if not html:
+    # Empty / error pages: nothing worth parsing
+    if not html or len(html) < MIN_HTML_LEN:
         return defaults
 
     try:
-        soup   = BeautifulSoup(html, "lxml")
-        text   = _text(soup)
+        tree = LexborHTMLParser(html)
+
+        # Element walks first, since _text() strips NON_TEXT_TAGS from the tree
+        links       = _link_signals(tree)
+        img_payment = _images_mention_payment(tree)
+        text        = _text(tree)
 
         # Contact info
         defaults["has_phone"]   = int(bool(PHONE_RE.search(text)))
         defaults["has_email"]   = int(bool(EMAIL_RE.search(text)))
-        defaults["has_address"] = int(any(kw in text for kw in ADDRESS_KW))
-
-        # Policy pages — check link text and href
-        all_links = [(a.get_text(" ", strip=True).lower(), (a.get("href") or "").lower())
-                     for a in soup.find_all("a", href=True)]
-
-        for field, keywords in POLICY_KW.items():
-            defaults[field] = int(
-                any(
-                    any(kw in link_text or kw in href for kw in keywords)
-                    for link_text, href in all_links
-                )
-            )
-
-        # Social links
-        defaults["has_social_links"] = int(
-            any(domain in href for _, href in all_links for domain in SOCIAL_DOMAINS)
-        )
-
-        # Payment badges — check images alt/src and visible text
-        img_alts = " ".join(
-            (img.get("alt") or "").lower() + " " + (img.get("src") or "").lower()
-            for img in soup.find_all("img")
-        )
-        combined = text + " " + img_alts
-        defaults["has_payment_badges"] = int(
-            any(kw in combined for kw in PAYMENT_KW)
-        )
-
-        defaults["trust_score"] = sum(
-            v for k, v in defaults.items() if k.startswith("has_")
-        )
+        hits = _keyword_hits(text)
+        defaults["has_address"] = int("has_address" in hits)
+
+        # Policy pages (link text + href) and social links (href), one walk
+        for field in LINK_SIGNALS:
+            defaults[field] = int(field in links)
+
+        # Payment badges — visible text or images alt/src
+        has_payment = "has_payment_badges" in hits or img_payment
+        defaults["has_payment_badges"] = int(has_payment)
+
+        defaults["trust_score"] = sum(defaults[k] for k in _HAS_KEYS)
 
     except Exception as e:
         log.warning(f"[Trust] parsing failed → {e}")
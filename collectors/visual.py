@@ -9,10 +9,12 @@ Returns:
     visual_overall       (1-10)
 """
 
+import io
 import json
 import logging
 import re
 from pathlib import Path
+from typing import Callable
 
 import google.generativeai as genai
 from PIL import Image
@@ -33,8 +35,31 @@ Analyse this full-page screenshot and return ONLY a JSON object (no markdown, no
 }
 """
 
+# Gemini downsamples images itself, so anything beyond this only costs upload time
+MAX_IMAGE_SIDE = 1024
+WEBP_QUALITY   = 75
 
-def get_visual_scores(screenshot_path: str = SCREENSHOT_PATH) -> dict:
+# Markdown code fences the model sometimes wraps its JSON in
+FENCE_OPEN_RE  = re.compile(r"^```[a-z]*\n?")
+FENCE_CLOSE_RE = re.compile(r"\n?```$")
+
+
+def prepare_image(screenshot_path: str) -> dict:
+    """Downscale the screenshot and re-encode it as WebP for upload (CPU-bound)."""
+    with Image.open(screenshot_path) as img:
+        img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=6)
+    return {"mime_type": "image/webp", "data": buf.getvalue()}
+
+
+def get_visual_scores(screenshot_path: str = SCREENSHOT_PATH,
+                      prepare: Callable[[str], dict] = prepare_image) -> dict:
+    """
+    Score the screenshot at `screenshot_path` with Gemini. `prepare` builds the
+    upload part from the path; pass a wrapper to run `prepare_image` elsewhere
+    (e.g. in a process pool) while the API call stays on the calling thread.
+    """
     defaults = {
         "visual_clutter_score": -1,
         "visual_modern_score":  -1,
@@ -47,14 +72,14 @@ def get_visual_scores(screenshot_path: str = SCREENSHOT_PATH) -> dict:
             log.warning("[Visual] Screenshot not found.")
             return defaults
 
-        img   = Image.open(screenshot_path)
+        img   = prepare(screenshot_path)
         model = genai.GenerativeModel(GEMINI_MODEL)
         resp  = model.generate_content([PROMPT, img])
         raw   = resp.text.strip()
 
         # Strip markdown code fences if model wraps in them
-        raw = re.sub(r"^```[a-z]*\n?", "", raw)
-        raw = re.sub(r"\n?```$", "", raw)
+        raw = FENCE_OPEN_RE.sub("", raw)
+        raw = FENCE_CLOSE_RE.sub("", raw)
 
         scores = json.loads(raw)
         return {
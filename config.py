@@ -13,6 +13,7 @@ GEMINI_API_KEY    = os.getenv("GEMINI_API_KEY",    "Your-API-KEY")
 HEADLESS          = True          # Set False to watch the browser during debugging
 PAGE_TIMEOUT_MS   = 30_000        # 30 s per navigation
 ACTION_TIMEOUT_MS = 5_000         # 5 s per element interaction
+LOAD_SETTLE_MS    = 5_000         # max wait for `load` after DOMContentLoaded
 VIEWPORT_DESKTOP  = {"width": 1440, "height": 900}
 VIEWPORT_MOBILE   = {"width": 390,  "height": 844}   # iPhone 14 Pro
 USER_AGENT        = (
@@ -24,6 +25,8 @@ USER_AGENT        = (
 # ── PageSpeed API ──────────────────────────────────────────────────────────────
 PAGESPEED_URL     = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
 PAGESPEED_STRATEGY = "mobile"    # "mobile" | "desktop"
+PAGESPEED_CACHE_DIR = ".pagespeed_cache"   # on-disk cache of successful results
+PAGESPEED_CACHE_TTL = 86_400                # seconds a cached result stays valid (24 h)
 
 # ── Gemini Vision ──────────────────────────────────────────────────────────────
 GEMINI_MODEL      = "gemini-2.5-flash"
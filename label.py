@@ -8,10 +8,24 @@ Usage:
 import argparse
 import pandas as pd
 
+SAVE_EVERY = 10     # persist progress after this many new labels
+
+
+def _save(df: pd.DataFrame, labels: dict, path: str):
+    """Apply pending labels to `df` in one batched assignment and write the CSV."""
+    if labels:
+        df.loc[list(labels), "label"] = list(labels.values())
+        labels.clear()
+    df.to_csv(path, index=False)
+
 
 def label_dataset(path: str):
     df = pd.read_csv(path)
-    unlabelled = df[df["label"].isna() | (df["label"] == "")].index.tolist()
+    df["label"] = df["label"].astype("object")   # all-NaN column loads as float
+    # Rows with no metrics are failed collection attempts; nothing to judge
+    metrics   = df.columns.difference(["url", "collected_at", "label"])
+    collected = df[metrics].notna().any(axis=1)
+    unlabelled = df[(df["label"].isna() | (df["label"] == "")) & collected].index.tolist()
 
     if not unlabelled:
         print("✅ All rows are already labelled.")
@@ -19,32 +33,39 @@ def label_dataset(path: str):
 
     print(f"Found {len(unlabelled)} unlabelled rows. Press Ctrl+C to stop.\n")
 
-    for idx in unlabelled:
-        row = df.loc[idx]
-        print("─" * 60)
-        print(f"URL:              {row['url']}")
-        print(f"Trust score:      {row.get('trust_score', '?')}/8")
-        print(f"Performance:      {row.get('performance_score', '?')}/100")
-        print(f"LCP:              {row.get('lcp_ms', '?')} ms")
-        print(f"Popup count:      {row.get('popup_count', '?')}")
-        print(f"Guest checkout:   {row.get('has_guest_checkout', '?')}")
-        print(f"Click depth:      {row.get('click_depth_to_checkout', '?')}")
-        print(f"Visual overall:   {row.get('visual_overall', '?')}/10")
-
-        while True:
-            choice = input("\nLabel [g=good / b=bad / s=skip]: ").strip().lower()
-            if choice in ("g", "b", "s"):
-                break
-            print("Please enter g, b, or s.")
-
-        if choice == "g":
-            df.at[idx, "label"] = "good"
-        elif choice == "b":
-            df.at[idx, "label"] = "bad"
-        else:
-            print("Skipped.")
+    labels = {}
+    try:
+        for idx in unlabelled:
+            row = df.loc[idx]
+            print("─" * 60)
+            print(f"URL:              {row['url']}")
+            print(f"Trust score:      {row.get('trust_score', '?')}/8")
+            print(f"Performance:      {row.get('performance_score', '?')}/100")
+            print(f"LCP:              {row.get('lcp_ms', '?')} ms")
+            print(f"Popup count:      {row.get('popup_count', '?')}")
+            print(f"Guest checkout:   {row.get('has_guest_checkout', '?')}")
+            print(f"Click depth:      {row.get('click_depth_to_checkout', '?')}")
+            print(f"Visual overall:   {row.get('visual_overall', '?')}/10")
 
-    df.to_csv(path, index=False)
+            while True:
+                choice = input("\nLabel [g=good / b=bad / s=skip]: ").strip().lower()
+                if choice in ("g", "b", "s"):
+                    break
+                print("Please enter g, b, or s.")
+
+            if choice == "g":
+                labels[idx] = "good"
+            elif choice == "b":
+                labels[idx] = "bad"
+            else:
+                print("Skipped.")
+
+            if len(labels) >= SAVE_EVERY:
+                _save(df, labels, path)
+    except KeyboardInterrupt:
+        print("\nStopped - saving labels entered so far.")
+
+    _save(df, labels, path)
     print(f"\n✅ Labels saved to {path}")
     print(df["label"].value_counts())
 
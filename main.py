@@ -8,7 +8,7 @@ Usage:
 For each URL the pipeline:
 1. Runs Playwright (behavioral + functional + screenshot)
 2. Calls PageSpeed API (performance)
-3. Scrapes HTML with BeautifulSoup (trust)
+3. Parses HTML with selectolax (trust)
 4. Calls Gemini Vision (visual quality)
 5. Appends one row to the output CSV
 """
@@ -17,34 +17,33 @@ import argparse
 import asyncio
 import csv
 import logging
+import multiprocessing
 import os
 import sys
-from datetime import datetime
+import time
+import uuid
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
+from urllib.parse import urlparse
 
-import pandas as pd
 from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
 
 # Collectors
-from collectors.behavioral import get_behavioral_metrics
-from collectors.performance import get_performance_metrics
+from collectors.behavioral import BehavioralCollector, get_behavioral_metrics
+from collectors.performance import get_performance_metrics_async, make_client
 from collectors.trust       import get_trust_signals
-from collectors.visual      import get_visual_scores
-from config import OUTPUT_CSV
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(open(sys.stdout.fileno(), mode='w', encoding='utf-8', closefd=False)),
-        logging.FileHandler("scraper.log", encoding="utf-8"),
-    ],
-)
+from collectors.visual      import get_visual_scores, prepare_image
+from config import OUTPUT_CSV, SCREENSHOT_PATH
+
 log = logging.getLogger("pipeline")
 
 
 # ── Column order (matches ML feature expectations) ────────────────────────────
-COLUMNS = [
+COLUMNS = (
     # Meta
     "url", "collected_at",
     # Behavioral
@@ -61,78 +60,350 @@ COLUMNS = [
     "visual_clutter_score", "visual_modern_score", "visual_image_quality", "visual_overall",
     # Label (to be filled manually or by a separate labelling script)
     "label",
-]
+)
 
 
-async def collect_one(url: str) -> dict:
-    """Collect all metrics for a single URL. Returns a flat dict."""
-    log.info(f">> Starting: {url}")
-    row = {"url": url, "collected_at": datetime.utcnow().isoformat(), "label": ""}
+def _now() -> str:
+    """UTC timestamp for the `collected_at` column."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _blank_row(url: str, ts: str) -> dict:
+    return {"url": url, "collected_at": ts}
 
-    # ── 1. Behavioral + functional (also captures HTML + screenshot) ───────────
-    log.info("  [1/4] Behavioral & functional (Playwright)…")
-    beh = await get_behavioral_metrics(url)
-    page_html = beh.pop("page_html", "")
-    row.update(beh)
 
-    # ── 2. Performance ─────────────────────────────────────────────────────────
-    log.info("  [2/4] Performance (PageSpeed API)…")
-    row.update(get_performance_metrics(url))
+async def collect_one(url: str, browser=None, client=None, ts: str | None = None,
+                      pool: ThreadPoolExecutor | None = None,
+                      proc_pool: ProcessPoolExecutor | None = None) -> dict:
+    """
+    Collect all metrics for a single URL. Returns a flat dict.
+    `browser` is a shared Chromium (each call opens its own contexts on it) and
+    `client` a shared PageSpeed HTTP client. `ts` is the row's `collected_at`
+    (defaults to now). The blocking collectors run on `pool` (the loop's
+    default executor if None); the screenshot re-encode runs on `proc_pool`
+    when given, so only that CPU work leaves the process.
+    """
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    log.debug(f">> Starting: {url}")
+    row = _blank_row(url, ts or _now()) | {"label": ""}
 
-    # ── 3. Trust signals ───────────────────────────────────────────────────────
-    log.info("  [3/4] Trust signals (BeautifulSoup)…")
-    row.update(get_trust_signals(page_html))
+    # Unique per call so concurrent URLs never score each other's screenshot
+    base = Path(SCREENSHOT_PATH)
+    shot = str(base.with_stem(f"{base.stem}_{uuid.uuid4().hex[:12]}"))
+
+    # Gemini scoring only needs the screenshot, so it starts as soon as the
+    # screenshot is written and overlaps the rest of the Playwright session
+    visual_task = None
+
+    def prepare(path: str) -> dict:
+        # Called on a `pool` thread, which just waits on the worker process;
+        # only the path goes over, the image is loaded and encoded there
+        if proc_pool is None:
+            return prepare_image(path)
+        return proc_pool.submit(prepare_image, path).result()
+
+    def start_visual(path: str):
+        nonlocal visual_task
+        visual_task = loop.run_in_executor(pool, get_visual_scores, path, prepare)
+
+    # PageSpeed only needs the URL, so it runs alongside the Playwright session
+    perf_task = asyncio.create_task(get_performance_metrics_async(url, client))
+
+    # ── 1. Behavioral + functional (also captures HTML + screenshot) ───────────
+    log.debug("  [1/4] Behavioral & functional (Playwright)…")
+    try:
+        beh = await get_behavioral_metrics(url, browser, on_screenshot=start_visual,
+                                           screenshot_path=shot)
+        page_html = beh.pop("page_html", "")
+        row.update(beh)
 
-    # ── 4. Visual quality ──────────────────────────────────────────────────────
-    log.info("  [4/4] Visual quality (Gemini)…")
-    row.update(get_visual_scores())
+        # ── 2-4. Performance, trust signals & visual quality, concurrently ────
+        log.debug("  [2-4/4] Performance (PageSpeed API), trust (selectolax), "
+                  "visual (Gemini)…")
+        perf, trust, vis = await asyncio.gather(
+            perf_task,
+            loop.run_in_executor(pool, get_trust_signals, page_html),
+            visual_task or loop.run_in_executor(pool, get_visual_scores, shot, prepare),
+        )
+        row.update(perf)
+        row.update(trust)
+        row.update(vis)
+    finally:
+        perf_task.cancel()      # no-op once it has finished
+        Path(shot).unlink(missing_ok=True)
 
-    log.info(f"  Done: {url}")
+    log.info(f"Done: {url} in {time.perf_counter() - t0:.1f}s")
     return row
 
 
-def save_row(row: dict, output_path: str):
-    """Append a single row to the CSV, writing header if file is new."""
-    path     = Path(output_path)
-    is_new   = not path.exists() or path.stat().st_size == 0
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
-        if is_new:
-            writer.writeheader()
-        writer.writerow(row)
+FLUSH_EVERY = 32        # rows between flush+fsync of the output CSV
+MAX_PARKED  = 10_000    # URLs held back behind busy hosts before input reading pauses
 
 
-async def run_pipeline(urls: list[str], output: str, delay: float = 2.0):
-    """Process all URLs sequentially with a polite delay between requests."""
-    log.info(f"Pipeline starting - {len(urls)} URL(s) -> {output}")
+def save_row(writer, row: dict):
+    """Append a single row through the run's shared `csv.writer`, in COLUMNS order."""
+    writer.writerow([row.get(c, "") for c in COLUMNS])
 
-    for url in tqdm(urls, desc="Sites"):
-        url = url.strip()
-        if not url or url.startswith("#"):
-            continue
-        try:
-            row = await collect_one(url)
-            save_row(row, output)
-        except Exception as e:
-            log.error(f"Failed for {url}: {e}", exc_info=True)
-            # Save a blank row so we know it was attempted
-            save_row({"url": url, "collected_at": datetime.utcnow().isoformat()}, output)
 
-        await asyncio.sleep(delay)   # polite delay between sites
+def _sync(f):
+    """Push buffered rows to disk."""
+    f.flush()
+    os.fsync(f.fileno())
 
-    log.info(f"Pipeline complete. Data saved to: {output}")
 
-    # Print summary
+def load_urls(path: str) -> Iterator[str]:
+    """Yield stripped, non-blank, non-comment URLs from `path`, one line at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+# Columns a collector fills; a row with none of them is a failed attempt
+METRIC_COLUMNS = tuple(c for c in COLUMNS if c not in ("url", "collected_at", "label"))
+
+
+def _collected(row: dict) -> bool:
+    return any(row.get(c) for c in METRIC_COLUMNS)
+
+
+def load_done(path: str) -> tuple[set[str], set[str]]:
+    """
+    (collected, failed) URLs in the output CSV at `path` (both empty if none).
+    `failed` holds URLs that only have blank rows from failed attempts; they
+    aren't in `collected`, so a resumed run retries them.
+    """
+    done, failed = set(), set()
     try:
-        df = pd.read_csv(output)
-        log.info(f"\nDataset shape: {df.shape}")
-        log.info(f"Columns: {list(df.columns)}")
-    except Exception:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                (done if _collected(row) else failed).add(row["url"])
+    except FileNotFoundError:
         pass
+    return done, failed - done
+
+
+def drop_stale_rows(path: str, urls: set[str]) -> int:
+    """
+    Rewrite the CSV at `path` without the blank rows of `urls` that a later row
+    for the same URL supersedes, i.e. failed attempts that have been retried.
+    Returns how many rows were dropped.
+    """
+    last: dict[str, int] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            if row["url"] in urls:
+                last[row["url"]] = i
+
+    def stale(i: int, row: dict) -> bool:
+        return row["url"] in last and i < last[row["url"]] and not _collected(row)
+
+    dropped = 0
+    tmp = f"{path}.tmp"
+    with open(path, newline="", encoding="utf-8") as src, \
+         open(tmp, "w", newline="", encoding="utf-8") as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=reader.fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for i, row in enumerate(reader):
+            if stale(i, row):
+                dropped += 1
+            else:
+                writer.writerow(row)
+    os.replace(tmp, path)
+    return dropped
+
+
+async def run_pipeline(urls: Iterable[str], output: str, delay: float = 2.0,
+                       concurrency: int = 5, total: int | None = None,
+                       force: bool = False):
+    """
+    Process URLs concurrently, at most `concurrency` at a time. Sites on the
+    same host still run one after another, started at least `delay` seconds apart.
+    `urls` is consumed lazily, so it can be a generator over a huge file;
+    `total` (if known) only feeds the progress bar.
+    URLs already present in `output` are skipped, so an interrupted run can
+    simply be restarted; pass `force=True` to collect them again. URLs whose
+    earlier attempt failed are retried, and the blank rows of the ones retried
+    here are dropped afterwards so each keeps a single row.
+    """
+    log.info(f"Pipeline starting - {total if total is not None else '?'} URL(s) -> {output}")
+
+    # One stat() per run decides the header (and whether there is anything to resume)
+    try:
+        header_needed = os.stat(output).st_size == 0
+    except FileNotFoundError:
+        header_needed = True
+    seen, failed = (set(), set()) if force or header_needed else load_done(output)
+    if seen:
+        log.info(f"Resuming - {len(seen)} URL(s) already in {output} will be skipped")
+
+    sem = asyncio.Semaphore(concurrency)
+    last_hit: dict[str, float] = {}         # host -> monotonic start time
+    rows: asyncio.Queue = asyncio.Queue()   # finished rows -> write_rows; None ends it
+    retried: set[str] = set()               # URLs from `failed` written again this run
+
+    async def worker(url: str, host: str):
+        # Sleep only what is left of the polite gap since this host's last start
+        wait = last_hit.get(host, float("-inf")) + delay - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        async with sem:
+            last_hit[host] = time.monotonic()
+            ts = _now()
+            try:
+                row = await collect_one(url, bc.browser, client, ts, pool, proc_pool)
+            except Exception as e:
+                log.error(f"Failed for {url}: {e}", exc_info=True)
+                # Save a blank row so we know it was attempted
+                row = _blank_row(url, ts)
+        await rows.put(row)
+
+    async def write_rows(f) -> int:
+        """Sole owner of the output CSV `f`: append rows from the queue until None."""
+        n = 0
+        writer = csv.writer(f)
+        if header_needed:
+            writer.writerow(COLUMNS)
+        try:
+            while (row := await rows.get()) is not None:
+                save_row(writer, row)
+                if row["url"] in failed:
+                    retried.add(row["url"])
+                bar.update()
+                n += 1
+                if n % FLUSH_EVERY == 0:
+                    _sync(f)
+        finally:
+            _sync(f)
+        return n
+
+    # Only a bounded window of URLs is turned into tasks at any time, at most
+    # one per host; further URLs for a busy host wait in that host's queue and
+    # don't count towards the window, so a long same-host run can't starve
+    # the other hosts behind it
+    url_iter = iter(urls)
+    window   = concurrency * 4
+    pending: dict[asyncio.Task, str] = {}   # task -> its host
+    waiting: dict[str, deque[str]] = {}     # busy host -> URLs parked behind it
+    parked   = 0
+    skipped  = 0
+
+    def start(url: str, host: str):
+        pending[asyncio.create_task(worker(url, host))] = host
+
+    def finished(host: str):
+        """The host's task is done: start its next parked URL, or free the host."""
+        nonlocal parked
+        if waiting[host]:
+            parked -= 1
+            start(waiting[host].popleft(), host)
+        else:
+            del waiting[host]
+
+    def refill():
+        nonlocal parked, skipped
+        while len(pending) < window and parked < MAX_PARKED:
+            url = next(url_iter, None)
+            if url is None:
+                return
+            if url in seen:
+                skipped += 1
+                bar.update()
+                continue
+            host = urlparse(url).netloc
+            if host in waiting:
+                waiting[host].append(url)
+                parked += 1
+            else:
+                waiting[host] = deque()
+                start(url, host)
+
+    # Blocking collectors (trust + visual per URL, Gemini calls included) on
+    # threads; only the screenshot decode/re-encode goes to worker processes,
+    # so the process count never caps how many Gemini requests are in flight.
+    # spawn: forking would copy Playwright/asyncio threads. Spawned workers
+    # re-import this module, so it must have no import-time side effects.
+    # One handle for the whole run (rows are block-buffered), opened before
+    # anything is collected so a bad path fails on the spot
+    out = open(output, "a", newline="", encoding="utf-8", buffering=1 << 16)
+    pool      = ThreadPoolExecutor(max_workers=2 * concurrency, thread_name_prefix="collector")
+    proc_pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2),
+                                    mp_context=multiprocessing.get_context("spawn"))
+
+    # One Chromium and one pooled HTTP/2 client for the whole run
+    try:
+        async with BehavioralCollector() as bc, make_client() as client:
+            # Log lines go through tqdm.write so they don't tear the progress bar
+            with logging_redirect_tqdm(), tqdm(total=total, desc="Sites") as bar:
+                writer_task = asyncio.create_task(write_rows(out))
+                try:
+                    refill()
+                    while pending:
+                        done, _ = await asyncio.wait([*pending, writer_task],
+                                                     return_when=asyncio.FIRST_COMPLETED)
+                        if writer_task in done:
+                            break       # the writer failed; don't collect rows nobody saves
+                        for task in done:
+                            finished(pending.pop(task))
+                        refill()
+                finally:
+                    if writer_task.done():
+                        for task in pending:
+                            task.cancel()
+                        await asyncio.gather(*pending, return_exceptions=True)
+                    else:
+                        await rows.put(None)
+                    n = await writer_task   # re-raises the writer's error, if any
+    finally:
+        out.close()
+        pool.shutdown(wait=True)
+        proc_pool.shutdown(wait=True)
+        if retried:
+            # Also after an interrupted run: rows written so far are on disk
+            try:
+                dropped = drop_stale_rows(output, retried)
+                log.info(f"Dropped {dropped} blank row(s) superseded by retries")
+            except OSError as e:
+                log.warning(f"Could not drop superseded blank rows from {output}: {e}")
+
+    log.info(f"Pipeline complete. Data saved to: {output}")
+    log.info(f"Rows written this run: {n}, skipped: {skipped}, columns: {len(COLUMNS)}")
 
 
 # ── CLI ────────────────────────────────────────────────────────────────────────
 
+def _positive_int(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
+def setup_logging(level: str):
+    """Console + scraper.log handlers; only called from the CLI entry point."""
+    sys.stdout.reconfigure(encoding="utf-8")   # keep UTF-8 console output on Windows
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler("scraper.log", encoding="utf-8"),
+        ],
+    )
+    # Only our own loggers; DEBUG on root would also turn on httpx/hpack chatter
+    for name in ("pipeline", "collectors"):
+        logging.getLogger(name).setLevel(level)
+    # httpx logs every request URL at INFO; keep it to warnings and errors
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
 def parse_args():
     p = argparse.ArgumentParser(
         description="Collect e-commerce website metrics for ML training"
@@ -143,12 +414,24 @@ def parse_args():
     p.add_argument("--output", type=str, default=OUTPUT_CSV,
                    help=f"Output CSV path (default: {OUTPUT_CSV})")
     p.add_argument("--delay", type=float, default=2.0,
-                   help="Seconds to wait between sites (default: 2)")
+                   help="Min seconds between starting sites on the same host (default: 2)")
+    p.add_argument("--concurrency", type=_positive_int, default=5,
+                   help="Max sites collected at once (default: 5)")
+    p.add_argument("--log-level", type=str.upper, default="INFO",
+                   choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                   help="Logging verbosity; DEBUG adds per-stage lines (default: INFO)")
+    p.add_argument("--force", action="store_true",
+                   help="Re-collect URLs that already have a row in the output CSV")
     return p.parse_args()
 
 
 if __name__ == "__main__":
     args  = parse_args()
-    urls  = [args.url] if args.url else Path(args.urls).read_text().splitlines()
-    urls  = [u.strip() for u in urls if u.strip() and not u.startswith("#")]
-    asyncio.run(run_pipeline(urls, args.output, args.delay))
+    setup_logging(args.log_level)
+    if args.url:
+        urls, total = [args.url.strip()], 1
+    else:
+        # Counting is a streaming pass too, so memory stays flat either way
+        urls, total = load_urls(args.urls), sum(1 for _ in load_urls(args.urls))
+    asyncio.run(run_pipeline(urls, args.output, args.delay, args.concurrency, total,
+                             args.force))
@@ -0,0 +1,79 @@
+"""
+PageSpeed result cache: URL normalisation, cache errors treated as a miss,
+and failed lookups never being cached.
+"""
+
+import asyncio
+
+import pytest
+
+from collectors import performance
+
+PSI_RESPONSE = {
+    "lighthouseResult": {
+        "categories": {"performance": {"score": 0.87}},
+        "audits": {
+            "largest-contentful-paint": {"numericValue": 2345.678},
+            "cumulative-layout-shift":  {"numericValue": 0.01234},
+            "total-blocking-time":      {"numericValue": 150.0},
+            "server-response-time":     {"numericValue": 320.5},
+        },
+    },
+}
+
+
+@pytest.fixture
+def fetches(monkeypatch, tmp_path):
+    """Fresh on-disk cache under tmp_path and a stubbed _fetch; returns the fetched URLs."""
+    monkeypatch.setattr(performance, "PAGESPEED_CACHE_DIR", str(tmp_path / "psi"))
+    monkeypatch.setattr(performance, "_psi_cache", None)
+    calls = []
+
+    async def fetch(client, params):
+        calls.append(params["url"])
+        return PSI_RESPONSE
+
+    monkeypatch.setattr(performance, "_fetch", fetch)
+    yield calls
+    if performance._psi_cache is not None:
+        performance._psi_cache.close()
+
+
+def metrics(url: str) -> dict:
+    return asyncio.run(performance.get_performance_metrics_async(url, client=object()))
+
+
+def test_url_variants_share_one_entry(fetches):
+    first = metrics("https://Shop.Example.com/p?id=1#reviews")
+    assert first["performance_score"] == 87.0
+    assert metrics("HTTPS://shop.example.com/p?id=1") == first
+    assert metrics("https://shop.example.com/p?id=1#top") == first
+    assert fetches == ["https://Shop.Example.com/p?id=1#reviews"]
+
+
+def test_bare_host_and_root_path_share_one_entry(fetches):
+    metrics("https://shop.example.com")
+    metrics("https://shop.example.com/")
+    assert len(fetches) == 1
+
+
+def test_cache_errors_fall_back_to_a_live_fetch(fetches, monkeypatch):
+    class BrokenCache:
+        def get(self, key):
+            raise OSError("database is locked")
+
+        def set(self, key, value, expire=None):
+            raise OSError("database is locked")
+
+    monkeypatch.setattr(performance, "_cache", BrokenCache)
+    assert metrics("https://shop.example.com/")["lcp_ms"] == 2345.68
+    assert fetches == ["https://shop.example.com/"]
+
+
+def test_failures_are_not_cached(fetches, monkeypatch):
+    async def failing(client, params):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(performance, "_fetch", failing)
+    assert set(metrics("https://shop.example.com/").values()) == {-1}
+    assert performance._cache_get("https://shop.example.com/") is None
@@ -0,0 +1,145 @@
+"""
+run_pipeline dispatch with a stubbed collect_one: per-host parking and
+spacing, blank rows for failures, and resume from an existing output CSV.
+"""
+
+import asyncio
+import contextlib
+import csv
+import time
+
+import pytest
+
+import main
+
+
+class FakeCollector:
+    browser = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@contextlib.asynccontextmanager
+async def fake_client():
+    yield None
+
+
+@pytest.fixture
+def starts(monkeypatch):
+    """Stub out browser/network; returns url -> monotonic start time of each call."""
+    calls: dict[str, float] = {}
+
+    async def collect_one(url, browser=None, client=None, ts=None, pool=None, proc_pool=None):
+        calls[url] = time.monotonic()
+        await asyncio.sleep(0.05)
+        if "fail" in url:
+            raise RuntimeError("boom")
+        return main._blank_row(url, ts) | {"popup_count": 0, "trust_score": 3, "label": ""}
+
+    monkeypatch.setattr(main, "collect_one", collect_one)
+    monkeypatch.setattr(main, "BehavioralCollector", FakeCollector)
+    monkeypatch.setattr(main, "make_client", fake_client)
+    return calls
+
+
+def run(urls, output, **kw):
+    asyncio.run(main.run_pipeline(iter(urls), str(output), **kw))
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_other_host_not_starved_behind_same_host_run(starts, tmp_path):
+    urls = [f"https://a.example/{i}" for i in range(30)] + ["https://b.example/"]
+    run(urls, tmp_path / "out.csv", delay=0, concurrency=2)
+    order = sorted(starts, key=starts.get)
+    # The window is 8 tasks; b must not wait for the 30 a.example URLs to drain
+    assert order.index("https://b.example/") <= 1
+
+
+def test_same_host_urls_spaced_by_delay(starts, tmp_path):
+    urls = [f"https://a.example/{i}" for i in range(3)] + ["https://b.example/"]
+    run(urls, tmp_path / "out.csv", delay=0.3, concurrency=4)
+    a_starts = sorted(t for u, t in starts.items() if "a.example" in u)
+    gaps = [later - earlier for earlier, later in zip(a_starts, a_starts[1:])]
+    # Load only lengthens gaps; the slack covers the event loop's clock resolution
+    assert all(gap >= 0.29 for gap in gaps)
+    # A different host doesn't wait on a.example's spacing
+    assert starts["https://b.example/"] < a_starts[1]
+
+
+def test_failure_writes_blank_row(starts, tmp_path):
+    out = tmp_path / "out.csv"
+    run(["https://a.example/", "https://fail.example/"], out, delay=0)
+    rows = {r["url"]: r for r in read_rows(out)}
+    assert rows["https://a.example/"]["trust_score"] == "3"
+    failed = rows["https://fail.example/"]
+    assert failed["collected_at"]
+    assert not any(failed[c] for c in main.METRIC_COLUMNS)
+
+
+def write_csv(path, rows):
+    """Output CSV with one row per (url, extra columns) pair."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(main.COLUMNS)
+        for url, extra in rows:
+            row = main._blank_row(url, "2026-01-01T00:00:00+00:00") | extra
+            writer.writerow([row.get(c, "") for c in main.COLUMNS])
+
+
+def test_resume_skips_collected_and_retries_failed(starts, tmp_path):
+    out = tmp_path / "out.csv"
+    write_csv(out, [("https://done.example/", {"trust_score": 5}),
+                    ("https://retry.example/", {})])
+
+    assert main.load_done(str(out)) == ({"https://done.example/"}, {"https://retry.example/"})
+
+    run(["https://done.example/", "https://retry.example/", "https://new.example/"],
+        out, delay=0)
+    assert set(starts) == {"https://retry.example/", "https://new.example/"}
+    rows = read_rows(out)
+    assert sorted(r["url"] for r in rows) == [
+        "https://done.example/", "https://new.example/", "https://retry.example/",
+    ]
+    assert all(r["trust_score"] for r in rows)
+
+
+def test_resume_keeps_blank_rows_it_does_not_retry(starts, tmp_path):
+    out = tmp_path / "out.csv"
+    write_csv(out, [("https://old-failed.example/", {}),
+                    ("https://fail.example/", {"collected_at": "earlier"})])
+
+    run(["https://other.example/", "https://fail.example/"], out, delay=0)
+    rows = read_rows(out)
+    # Not part of this run, so its record of the failed attempt stays
+    assert rows[0]["url"] == "https://old-failed.example/"
+    assert sorted(r["url"] for r in rows[1:]) == [
+        "https://fail.example/", "https://other.example/",
+    ]
+    # Failed again: this run's blank row replaces the earlier one
+    (again,) = [r for r in rows if r["url"] == "https://fail.example/"]
+    assert again["collected_at"] != "earlier"
+
+
+def test_unwritable_output_fails_before_collecting(starts, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        run(["https://a.example/"], tmp_path / "missing" / "out.csv", delay=0)
+    assert not starts
+
+
+def test_writer_failure_stops_dispatch(starts, tmp_path, monkeypatch):
+    def save_row(writer, row):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(main, "save_row", save_row)
+    urls = [f"https://h{i}.example/" for i in range(40)]
+    with pytest.raises(OSError, match="disk full"):
+        run(urls, tmp_path / "out.csv", delay=0, concurrency=2)
+    assert len(starts) < len(urls)
@@ -0,0 +1,85 @@
+"""
+Expected trust signals for representative pages. The expectations were
+recorded from the original BeautifulSoup implementation, so they double as
+a parity check for the selectolax collector.
+"""
+
+import pytest
+
+from collectors.trust import get_trust_signals
+
+
+# ── Fixtures ───────────────────────────────────────────────────────────────────
+FILLER = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12 + "</p>"
+
+
+def page(head: str = "", body: str = "") -> str:
+    return f"<!doctype html><html><head>{head}</head><body>{body}{FILLER}</body></html>"
+
+
+PAGES = {
+    "inline_script_and_style": page(
+        head="<title>Shop</title><style>.floor{color:red}</style>",
+        body='<script>var w=Math.floor(x); fetch("/api/ssl")</script>'
+             '<script>var t=1234567890123; "a@b.co"</script>'
+             "<h1>Welcome</h1>",
+    ),
+    "phone_in_title": page(
+        head="<title>Call us +1 (800) 555-1234</title>",
+        body="<h1>Deals</h1>",
+    ),
+    "full_footer": page(
+        body='<header><a href="/">Home</a></header>'
+             "<footer>"
+             '<a href="/pages/returns">Returns &amp; Exchanges</a>'
+             '<a href="/policies/privacy-policy">Privacy</a>'
+             '<a href="/terms">Terms and Conditions</a>'
+             '<a href="https://www.instagram.com/shop">IG</a>'
+             '<img alt="Visa" src="/cdn/visa.svg">'
+             "<address>12 Main Street, Suite 4</address>"
+             "<p>help@shop.example.com</p>"
+             "</footer>",
+    ),
+    "payment_in_image_only": page(
+        body='<img src="/badges/paypal-logo.png" alt=""><a href="/about">About</a>',
+    ),
+    "noscript_lazy_markup": page(
+        body='<noscript><img alt="Visa" src="/badge.png">'
+             '<a href="/pages/refunds">Refunds</a></noscript>',
+    ),
+    "noscript_text": page(
+        body="<noscript>Call us at +1 (800) 555-1234 or help@shop.com, "
+             "5 Main Street</noscript>",
+    ),
+    # A phone-like run glued to an email: each pattern must still match alone
+    "phone_glued_to_email": page(body="<p>contact 18005551234@support.example.com</p>"),
+    "email_local_part_digits": page(body="<p>orders5551234567@shop.com</p>"),
+    "bare": page(body="<h1>Coming soon</h1>"),
+}
+
+
+SIGNALS = ("has_phone", "has_email", "has_address", "has_return_policy",
+           "has_privacy_policy", "has_tos", "has_social_links", "has_payment_badges")
+
+# Signals that fire on each page; every other signal is 0
+EXPECTED = {
+    "inline_script_and_style": set(),
+    "phone_in_title":          {"has_phone"},
+    "full_footer":             {"has_email", "has_address", "has_return_policy",
+                                "has_privacy_policy", "has_tos", "has_social_links",
+                                "has_payment_badges"},
+    "payment_in_image_only":   {"has_payment_badges"},
+    "noscript_lazy_markup":    {"has_return_policy", "has_payment_badges"},
+    "noscript_text":           {"has_phone", "has_email", "has_address"},
+    "phone_glued_to_email":    {"has_phone", "has_email"},
+    "email_local_part_digits": {"has_phone", "has_email"},
+    "bare":                    set(),
+}
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_expected_signals(name):
+    expected = {k: int(k in EXPECTED[name]) for k in SIGNALS}
+    expected["trust_score"] = len(EXPECTED[name])
+    assert get_trust_signals(PAGES[name]) == expected
+